@@ -1,50 +1,163 @@
 import os
+import io
 import asyncio
 import time
+import hashlib
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+import zipfile
+import tempfile
+from xml.sax.saxutils import escape
+from lxml import etree
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 from pathlib import Path
 from typing import List, Tuple, Optional
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+from contextlib import asynccontextmanager
 import dotenv
-from functools import partial
+import orjson
+import httpx
 
-from openai import OpenAI
+import openai
+from openai import AsyncOpenAI
 
-import instructor
+from aiolimiter import AsyncLimiter
 from pydantic import BaseModel, Field
-from collections import defaultdict
 
 dotenv.load_dotenv()
 
 # Configuration
 INPUT_FOLDER = "input_docs"
 OUTPUT_FOLDER = "analysis_results"
+CACHE_FOLDER = os.getenv("CACHE_FOLDER", ".cache")
+TEXT_CACHE_FOLDER = Path(OUTPUT_FOLDER) / ".text_cache"
+CHECKPOINT_FILE = os.getenv("CHECKPOINT_FILE", os.path.join(OUTPUT_FOLDER, "checkpoint.jsonl"))
 
 MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "10"))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "1"))
 RETRY_DELAY = int(os.getenv("RETRY_DELAY", "1"))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "600"))
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "0"))
+
+# Short cases can share a single request; longer ones are always sent alone
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "1"))
+BATCH_MAX_CHARS = int(os.getenv("BATCH_MAX_CHARS", "20000"))
+
+# Documents shorter than MIN_CHARS are not worth a request; longer than
+# MAX_CHARS would overflow the model's context window and are truncated
+MIN_CHARS = int(os.getenv("MIN_CHARS", "200"))
+MAX_CHARS = int(os.getenv("MAX_CHARS", "400000"))
+
+# Skip the model for cases that never mention the issue
+PREFILTER_KEYWORDS = os.getenv("PREFILTER_KEYWORDS", "true").lower() in ("1", "true", "yes")
+_KEYWORDS = ("spoliation", "impairment of a civil claim")
 
 # OpenAI model name can be specified if needed
 # For example, you might set an environment variable OPENAI_MODEL_NAME, or just hardcode a model name.
 OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "o1")
 
-# Thread pool for concurrency
-thread_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Full tracebacks are costly to format during an error storm, so only include them on request
+DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+logger = logging.getLogger(__name__)
+
+class AdaptiveLimiter:
+    """
+    Caps the number of in-flight model calls with an AIMD limit: it grows by
+    one after each successful call and halves on a rate limit or timeout,
+    staying between 1 and max_limit.
+
+    Only calls started since the last decrease adjust the limit. Calls that
+    were already in flight were sent under the old, higher limit, so their
+    successes would undo the halving and their failures would halve it again
+    for the same overload.
+    """
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self._generation = 0
+        self._condition = asyncio.Condition()
+        self._last_report = time.monotonic()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one slot under the limit for the duration of a model call."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            generation = self._generation
+
+        exc_type = None
+        try:
+            yield
+        except BaseException as e:
+            exc_type = type(e)
+            raise
+        finally:
+            await self._release(generation, exc_type)
+
+    async def _release(self, generation: int, exc_type):
+        async with self._condition:
+            self.in_flight -= 1
+            if generation == self._generation:
+                if exc_type is None:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                elif issubclass(exc_type, (openai.RateLimitError, openai.APITimeoutError)):
+                    self.limit = max(1, self.limit // 2)
+                    self._generation += 1
+            # Only wake as many waiters as there are free slots under the new limit
+            self._condition.notify(max(0, self.limit - self.in_flight))
+
+        if time.monotonic() - self._last_report >= 60:
+            self._last_report = time.monotonic()
+            logger.info("Concurrency limit: %d (%d in flight)", self.limit, self.in_flight)
+
+# Replaced at the start of each main_async run, and otherwise created on first
+# use, because the limiter's condition binds to the event loop that first uses it.
+_limiter: Optional[AdaptiveLimiter] = None
+
+def _get_limiter() -> AdaptiveLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = AdaptiveLimiter(MAX_CONCURRENT_REQUESTS)
+    return _limiter
+
+# Throttle requests (and optionally input tokens) per minute up front rather
+# than discovering the account limits through 429 responses.
+_rpm = AsyncLimiter(OPENAI_RPM, 60)
+_tpm = AsyncLimiter(OPENAI_TPM, 60) if OPENAI_TPM > 0 else None
 
 class ExtractCaseRelevancy(BaseModel):
     blue_book_citation: str = Field(..., description="The full Blue Book style citation for this case.")
     summary: str = Field(..., description="A brief summary of the case, 2-4 sentences.")
     relevance_level: str = Field(..., description="One of 'High', 'Medium', or 'Low' relevancy to the issue of whether intentional spoliation should be recognized as a standalone tort after Reynolds v. Bordelon.")
     reasoning: str = Field(..., description="Explanation of why it was assigned this relevance level.")
-    key_points: List[str] = Field(..., description="A list of key points or mentions in the case related to spoliation.")
-    citations: List[str] = Field(..., description="List of the key cases cited in the opinion.")
-    quotes: List[str] = Field(..., description="Key quotes (if any) from the case that support or refute the argument about intentional spoliation not being a standalone tort, cited in blue book style to the exact page number.")
+    key_points: Tuple[str, ...] = Field(..., description="A list of key points or mentions in the case related to spoliation.")
+    citations: Tuple[str, ...] = Field(..., description="List of the key cases cited in the opinion.")
+    quotes: Tuple[str, ...] = Field(..., description="Key quotes (if any) from the case that support or refute the argument about intentional spoliation not being a standalone tort, cited in blue book style to the exact page number.")
     argument: str = Field(..., description="A concise argument explaining how this case supports the Reynolds court's rationale that intentional spoliation should not be recognized as a standalone tort, or if the case does not support the argument, attempt to distinguish the case. IMPORTANT:The Argument section should be styled like the analysis section of a legal brief. Every citation to a fact or conclusion of law must be supported by a Blue Book citation to the case being referenced.")
     support_level: str = Field(..., description="One of 'Strongly Supports', 'Supports', or 'Does not Support'.")
 
+def load_cached_analysis(data: dict) -> ExtractCaseRelevancy:
+    """Rebuild an analysis we serialized ourselves, skipping pydantic validation."""
+    return ExtractCaseRelevancy.model_construct(**data)
+
+class BatchCaseAnalysis(BaseModel):
+    case_number: int = Field(..., description="The number n from the '# CASE n' heading of the case this analysis is for.")
+    analysis: ExtractCaseRelevancy
+
+class ExtractCaseRelevancyBatch(BaseModel):
+    cases: List[BatchCaseAnalysis] = Field(..., description="One entry per case given.")
+
 class SayHi(BaseModel):
     hi: str = Field(..., description="Say hi")
 
@@ -54,80 +167,181 @@ class DocumentAnalysis:
     analysis: Optional[ExtractCaseRelevancy]
     error: Optional[str] = None
 
+_NS = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
+_W = f"{{{_NS['w']}}}"
+# Run children python-docx renders as text; w:br is only a newline when it is a
+# line (not page or column) break
+_RUN_TEXT = {f"{_W}tab": "\t", f"{_W}ptab": "\t", f"{_W}cr": "\n", f"{_W}noBreakHyphen": "-"}
+
+def _run_node_text(node) -> str:
+    if node.tag == f"{_W}t":
+        return node.text or ""
+    if node.tag == f"{_W}br":
+        return "\n" if node.get(f"{_W}type", "textWrapping") == "textWrapping" else ""
+    return _RUN_TEXT[node.tag]
+_OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+def _main_document_part(archive: zipfile.ZipFile) -> str:
+    """Locate the main document part; not every producer uses word/document.xml."""
+    rels = etree.fromstring(archive.read("_rels/.rels"))
+    for rel in rels:
+        if rel.get("Type") == _OFFICE_DOCUMENT_REL:
+            return rel.get("Target").lstrip("/")
+    return "word/document.xml"
+
 def extract_text_from_docx(file_path):
-    from docx import Document as DocxDocument
-    doc = DocxDocument(file_path)
-    text = "\n".join(paragraph.text for paragraph in doc.paragraphs)
+    """
+    Stream paragraph text out of the main document part with lxml rather than
+    building python-docx's object model for the whole document.
+
+    Like python-docx's doc.paragraphs, only body-level paragraphs are read and
+    only their own runs (including hyperlinks), so tables, headnote boxes and
+    text boxes stay out of the prompt.
+    """
+    parts = []
+    with zipfile.ZipFile(file_path) as archive, archive.open(_main_document_part(archive)) as xml:
+        for _, paragraph in etree.iterparse(xml, events=("end",), tag=f"{_W}p"):
+            if paragraph.getparent().tag != f"{_W}body":
+                # Freed along with its table or run once the body moves past it
+                continue
+            parts.append("".join(
+                _run_node_text(node)
+                for run in paragraph.xpath("w:r | w:hyperlink/w:r", namespaces=_NS)
+                for node in run.iterchildren(f"{_W}t", f"{_W}br", *_RUN_TEXT)
+            ))
+            paragraph.clear()
+            # Drop already-processed siblings so memory stays flat on large files
+            while paragraph.getprevious() is not None:
+                del paragraph.getparent()[0]
+    return "\n".join(parts)
+
+_RUN_BREAKS = {"\t": "<w:tab/>", "\n": "<w:br/>", "\r": "<w:br/>"}
+
+def _run_xml(text: str) -> str:
+    """A w:r for text, with tabs and line breaks turned into w:tab and w:br as python-docx's add_run does."""
+    pieces = []
+    start = 0
+    for i, char in enumerate(text):
+        if char in _RUN_BREAKS:
+            if i > start:
+                pieces.append(f'<w:t xml:space="preserve">{escape(text[start:i])}</w:t>')
+            pieces.append(_RUN_BREAKS[char])
+            start = i + 1
+    if start < len(text):
+        pieces.append(f'<w:t xml:space="preserve">{escape(text[start:])}</w:t>')
+    return f"<w:r>{''.join(pieces)}</w:r>"
+
+def _paragraph_xml(*texts: str, style: Optional[str] = None, ind: str = "", jc: str = "") -> str:
+    props = (f'<w:pStyle w:val="{style}"/>' if style else "") + ind + (f'<w:jc w:val="{jc}"/>' if jc else "")
+    ppr = f"<w:pPr>{props}</w:pPr>" if props else ""
+    return f"<w:p>{ppr}{''.join(_run_xml(t) for t in texts)}</w:p>"
+
+# Serialized blank report, so later documents skip re-reading python-docx's
+# default template and re-applying the styles
+_report_template: Optional[bytes] = None
+
+def new_report_document():
+    """Create an output document with the report's heading color and bullet indent set on its styles."""
+    global _report_template
+    if _report_template is None:
+        doc = Document()
+        doc.styles['Heading 2'].font.color.rgb = RGBColor(0, 51, 102)
+        doc.styles['List Bullet'].paragraph_format.left_indent = Inches(0.5)
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        _report_template = buffer.getvalue()
+    return Document(io.BytesIO(_report_template))
+
+def _write_cache_file(path: Path, data: bytes):
+    # Write to a temporary file first so an interrupted run never leaves a truncated entry,
+    # under a unique name, so concurrent writers of the same key never share one
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False)
+    try:
+        with tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+    except BaseException:
+        # Don't leave the partial file behind when the disk is full or the rename fails
+        os.unlink(tmp.name)
+        raise
+
+# Bump when extract_text_from_docx's output changes so stale entries are ignored
+_TEXT_CACHE_VERSION = 3
+
+def _source_key(file_path) -> str:
+    """Identifies a document's extracted text by its path, mtime and size."""
+    st = os.stat(file_path)
+    return f"{_TEXT_CACHE_VERSION}:{file_path}:{st.st_mtime_ns}:{st.st_size}"
+
+def cached_extract(file_path):
+    """
+    extract_text_from_docx with a sidecar text cache keyed by path, mtime and
+    size, so unchanged files are not re-parsed on later runs.
+    """
+    key = hashlib.blake2b(_source_key(file_path).encode("utf-8"), digest_size=16).hexdigest()
+    cache_path = TEXT_CACHE_FOLDER / f"{key}.txt"
+    if cache_path.exists():
+        return cache_path.read_text(encoding="utf-8")
+    text = extract_text_from_docx(file_path)
+    try:
+        _write_cache_file(cache_path, text.encode("utf-8"))
+    except OSError:
+        pass  # The text is still good; it is just re-parsed next run
     return text
 
 def create_formatted_docx(doc, filename, analysis: ExtractCaseRelevancy, is_first=False):
-    """Add a formatted analysis to the Word document."""
+    """
+    Add a formatted analysis to the Word document.
+
+    The body is built as a single XML fragment and inserted in one step rather
+    than through a python-docx call per heading and paragraph.
+    """
+    heading1 = doc.styles['Heading 1'].style_id
+    heading2 = doc.styles['Heading 2'].style_id
+    bullet = doc.styles['List Bullet'].style_id
+
+    first_line = '<w:ind w:firstLine="360"/>'  # 0.25"
+
+    def bullets(items):
+        return "".join(_paragraph_xml(item, style=bullet) for item in items)
+
+    parts = []
     if not is_first:
         # Add page break between documents
-        doc.add_page_break()
-    
-    # Add title
-    title = doc.add_heading(f'Case Analysis: {analysis.blue_book_citation}', level=1)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Add horizontal line
-    doc.add_paragraph('_' * 50)
-    
-    # SUMMARY
-    heading = doc.add_heading('SUMMARY', level=2)
-    heading.style.font.color.rgb = RGBColor(0, 51, 102)
-    summary_para = doc.add_paragraph(analysis.summary)
-    summary_para.paragraph_format.first_line_indent = Inches(0.25)
-
-    # RELEVANCY
-    heading = doc.add_heading('RELEVANCY', level=2)
-    heading.style.font.color.rgb = RGBColor(0, 51, 102)
-    rel_para = doc.add_paragraph()
-    rel_para.add_run(f"Relevance Level: {analysis.relevance_level}\n")
-    rel_para.add_run(f"Reasoning: {analysis.reasoning}\n")
-
-    # SUPPORT LEVEL
-    heading = doc.add_heading('SUPPORT LEVEL', level=2)
-    heading.style.font.color.rgb = RGBColor(0, 51, 102)
-    supp_para = doc.add_paragraph()
-    supp_para.add_run(f"Support Level: {analysis.support_level}\n")
-
-    # ARGUMENT
-    heading = doc.add_heading('ARGUMENT', level=2)
-    heading.style.font.color.rgb = RGBColor(0, 51, 102)
-    arg_para = doc.add_paragraph(analysis.argument)
-    arg_para.paragraph_format.first_line_indent = Inches(0.25)
-
-    # KEY POINTS
-    heading = doc.add_heading('KEY POINTS RELATED TO SPOLIATION', level=2)
-    heading.style.font.color.rgb = RGBColor(0, 51, 102)
-    for point in analysis.key_points:
-        kp = doc.add_paragraph(point, style='List Bullet')
-        kp.paragraph_format.left_indent = Inches(0.5)
-
-    # CITATIONS
-    heading = doc.add_heading('CITATIONS', level=2)
-    heading.style.font.color.rgb = RGBColor(0, 51, 102)
-    for cite in analysis.citations:
-        cp = doc.add_paragraph(cite, style='List Bullet')
-        cp.paragraph_format.left_indent = Inches(0.5)
-
-    # QUOTES
-    heading = doc.add_heading('QUOTES', level=2)
-    heading.style.font.color.rgb = RGBColor(0, 51, 102)
-    for quote in analysis.quotes:
-        qp = doc.add_paragraph(quote, style='List Bullet')
-        qp.paragraph_format.left_indent = Inches(0.5)
+        parts.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+
+    parts += [
+        _paragraph_xml(f'Case Analysis: {analysis.blue_book_citation}', style=heading1, jc="center"),
+        _paragraph_xml('_' * 50),
+        _paragraph_xml('SUMMARY', style=heading2),
+        _paragraph_xml(analysis.summary, ind=first_line),
+        _paragraph_xml('RELEVANCY', style=heading2),
+        _paragraph_xml(f"Relevance Level: {analysis.relevance_level}\n", f"Reasoning: {analysis.reasoning}\n"),
+        _paragraph_xml('SUPPORT LEVEL', style=heading2),
+        _paragraph_xml(f"Support Level: {analysis.support_level}\n"),
+        _paragraph_xml('ARGUMENT', style=heading2),
+        _paragraph_xml(analysis.argument, ind=first_line),
+        _paragraph_xml('KEY POINTS RELATED TO SPOLIATION', style=heading2),
+        bullets(analysis.key_points),
+        _paragraph_xml('CITATIONS', style=heading2),
+        bullets(analysis.citations),
+        _paragraph_xml('QUOTES', style=heading2),
+        bullets(analysis.quotes),
+    ]
+
+    body = doc.element.body
+    fragment = parse_xml(f"<w:body {nsdecls('w')}>{''.join(parts)}</w:body>")
+    for element in list(fragment):
+        # Keep the section properties as the last child of the body
+        if body.sectPr is not None:
+            body.sectPr.addprevious(element)
+        else:
+            body.append(element)
 
     return doc
 
-async def analyze_text_with_instructor(client, text: str, filename: str, retry_count: int = 0) -> DocumentAnalysis:
-    """
-    Analyze text using an OpenAI model via instructor.
-    """
-    print(f"Retry count: {retry_count}")
-
-    system_prompt = """You are a legal research assistant with extensive knowledge of Louisiana tort law and the reasoning in Reynolds v. Bordelon. 
+_SYSTEM_PROMPT = """You are a legal research assistant with extensive knowledge of Louisiana tort law and the reasoning in Reynolds v. Bordelon. 
 
 You will be given the text of a Louisiana court case that uses either the phrase "intentional spoliation" or "impairment of a civil claim."
 
@@ -158,7 +372,7 @@ Follow the structure and fields defined in the structured output model:
 blue_book_citation, summary, relevance_level, reasoning, key_points, citations, quotes, argument, support_level.
 """
 
-    user_prompt = f"""
+_REYNOLDS_REFERENCE = """
     # REYNOLDS v. BORDELAN CASE FOR REFERENCE:
 
     **1 The instant case presents a claim under the Louisiana Products Liability Act (“LPLA”). We granted its companion case to determine the viability of negligent spoliation of evidence as a cause of action in Louisiana.1 We now address the underlying products liability case and review the appropriateness of the lower court's grant of summary judgment. For the reasons expressed below, we affirm.
@@ -218,238 +432,534 @@ Last, the plaintiff brought a claim under the express warranty provision of the
 Dr. Baratta's affidavit opines that the owner's manual gave an expectation that in a high severity side impact, the side curtain air bags would deploy. However, and as discussed above, the manual specifically provided that the side air bags “may not *616 inflate in certain side collisions.” Thus, in the absence of an express **12 statement warranting to the plaintiff that his air bags would have deployed in a collision substantially similar to his own, we find he cannot prevail on this claim at trial.
 CONCLUSION
 For the reasons expressed herein, we find no error in the grant of summary judgment in favor of Nissan and we affirm the judgment of the court of appeal. AFFIRMED.
+"""
 
+def _response_tool(model) -> dict:
+    return {
+        "type": "function",
+        "function": {
+            "name": model.__name__,
+            "description": f"Correctly extracted `{model.__name__}` with all the required parameters with correct types",
+            "parameters": model.model_json_schema(),
+        },
+    }
+
+# The response schemas never change, so build their tool definitions once
+_RESPONSE_TOOLS = {model: _response_tool(model) for model in (ExtractCaseRelevancy, ExtractCaseRelevancyBatch)}
+
+_ARGUMENT_STYLE_NOTE = "IMPORTANT:The Argument section should be styled like the analysis section of a legal brief. Every citation to a fact or conclusion of law must be supported by a Blue Book citation to the case being referenced."
+
+async def _create_completion(client, messages, response_model, prompt_chars: int):
+    """Send one structured-output request, respecting the rate and concurrency limits."""
+    if _tpm is not None:
+        # Rough estimate of ~4 characters per token
+        await _tpm.acquire(min(prompt_chars // 4, _tpm.max_rate))
+
+    if OPENAI_MODEL_NAME == "o1":
+        options = {"reasoning_effort": "high"}
+    else:
+        options = {"temperature": 0}
+
+    async with _rpm, _get_limiter().slot():
+        # Force the response model's prebuilt tool, so the schema is never
+        # regenerated per request
+        tool = _RESPONSE_TOOLS[response_model]
+        completion = await client.chat.completions.create(
+            messages=messages,
+            model=OPENAI_MODEL_NAME,
+            tools=[tool],
+            tool_choice={"type": "function", "function": {"name": tool["function"]["name"]}},
+            **options
+        )
+
+    tool_calls = completion.choices[0].message.tool_calls
+    if not tool_calls:
+        raise ValueError(f"Model did not return a {response_model.__name__} tool call")
+    return response_model.model_validate_json(tool_calls[0].function.arguments)
+
+# Transient failures worth another attempt; anything else fails the document immediately
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.InternalServerError,
+)
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Seconds to wait before retrying, preferring the server's Retry-After hint.
+    The client is built with the SDK's own retries off, so this is the only backoff.
+    """
+    response = getattr(error, "response", None)
+    headers = response.headers if response is not None else {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # An HTTP-date Retry-After; fall back to exponential backoff
+    return RETRY_DELAY * (2 ** attempt)
+
+def _build_user_prompt(text: str) -> str:
+    return f"""{_REYNOLDS_REFERENCE}
 # THE CASE TEXT YOU ARE ANALYZING:
 
-IMPORTANT:The Argument section should be styled like the analysis section of a legal brief. Every citation to a fact or conclusion of law must be supported by a Blue Book citation to the case being referenced.
+{_ARGUMENT_STYLE_NOTE}
 
 {text}
 """
 
+_ANALYSIS_CACHE = Path(CACHE_FOLDER)
+
+def analysis_cache_path(folder: Path, text: str) -> Path:
+    """Where the analysis of text is cached, keyed by a SHA-256 of the model name and the full prompt."""
+    key = hashlib.sha256(
+        (OPENAI_MODEL_NAME + _SYSTEM_PROMPT + _build_user_prompt(text)).encode("utf-8")
+    ).hexdigest()
+    return folder / f"{key}.json"
+
+async def _store_analysis(path: Path, filename: str, analysis: ExtractCaseRelevancy):
+    try:
+        await asyncio.to_thread(_write_cache_file, path, orjson.dumps(analysis.model_dump()))
+    except OSError as e:
+        # The analysis is already paid for; losing its cache entry is not worth failing it
+        logger.warning("\033[33m⚠️  Could not cache analysis of %s: %s\033[0m", filename, e)
+
+def disk_cache(folder: Path):
+    """
+    Cache successful analyses on disk, keyed by a SHA-256 of the model name and
+    the full prompt, so unchanged documents skip the API on later runs.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(client, text: str, filename: str, *args, **kwargs) -> DocumentAnalysis:
+            path = analysis_cache_path(folder, text)
+
+            if path.exists():
+                raw = await asyncio.to_thread(path.read_bytes)
+                logger.info("✓ Cache hit for %s", filename)
+                return DocumentAnalysis(filename=filename, analysis=load_cached_analysis(orjson.loads(raw)))
+
+            result = await func(client, text, filename, *args, **kwargs)
+            if result.analysis is not None:
+                await _store_analysis(path, filename, result.analysis)
+            return result
+        return wrapper
+    return decorator
+
+@disk_cache(_ANALYSIS_CACHE)
+async def analyze_text(client, text: str, filename: str, retry_count: int = 0) -> DocumentAnalysis:
+    """
+    Analyze text using an OpenAI model, read back through a forced tool call.
+    """
+    logger.debug("retry=%d file=%s", retry_count, filename)
+
+    user_prompt = _build_user_prompt(text)
+
+    messages = [
+        {"role": "developer", "content": _SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
     for attempt in range(retry_count, MAX_RETRIES + 1):
         try:
-            messages = [
-                {"role": "developer", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-
-            if OPENAI_MODEL_NAME == "o1":
-                resp = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    partial(
-                        client.messages.create,
-                        messages=messages,
-                        model=OPENAI_MODEL_NAME,
-                        reasoning_effort="high",
-                        response_model=ExtractCaseRelevancy,
-                    )
-                )
-            else:
-                resp = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    partial(
-                        client.messages.create,
-                        messages=messages,
-                        model=OPENAI_MODEL_NAME,
-                        response_model=ExtractCaseRelevancy,
-                        temperature=0
-                    )
-                )
-            print("✓ Model call successful")
+            resp = await _create_completion(client, messages, ExtractCaseRelevancy, len(user_prompt))
+            logger.info("✓ Model call successful for %s", filename)
 
             return DocumentAnalysis(filename=filename, analysis=resp)
             
-        except Exception as e:
-            print(f"\n❌ Parse error for {filename}:")
-            print(f"Error type: {type(e)}")
-            print(f"Error message: {str(e)}")
-            import traceback
-            print("Full traceback:")
-            traceback.print_exc()
+        except _RETRYABLE_ERRORS as e:
+            logger.error("❌ Parse error for %s: %s: %s", filename, type(e).__name__, e, exc_info=DEBUG)
             
             if attempt < MAX_RETRIES:
-                wait_time = RETRY_DELAY * (2 ** attempt)
-                print(f"\033[33m⚠️  Retrying in {wait_time}s...\033[0m")
+                wait_time = _retry_delay(e, attempt)
+                logger.warning("\033[33m⚠️  Retrying %s in %ss...\033[0m", filename, wait_time)
                 await asyncio.sleep(wait_time)
             else:
                 error_msg = f"Failed after {MAX_RETRIES} retries: {e}"
                 return DocumentAnalysis(filename=filename, analysis=None, error=error_msg)
 
-async def process_document_batch(client, batch: List[Tuple[str, str]]) -> List[DocumentAnalysis]:
-    """Process a batch of documents concurrently."""
-    tasks = []
-    for filename, text in batch:
-        task = analyze_text_with_instructor(client, text, filename)
-        tasks.append(task)
-    
-    results = await asyncio.gather(*tasks, return_exceptions=False)
-    return results
+        except Exception as e:
+            # Bad requests, auth failures and schema validation errors will not
+            # succeed on a retry
+            logger.error("❌ Parse error for %s: %s: %s", filename, type(e).__name__, e, exc_info=DEBUG)
+            return DocumentAnalysis(filename=filename, analysis=None, error=f"{type(e).__name__}: {e}")
+
+async def analyze_batch(client, texts: List[Tuple[str, str]]) -> List[DocumentAnalysis]:
+    """
+    Analyze several short cases in a single request so the shared prompt prefix
+    is only sent once. Each analysis is matched back to its document by case
+    number. Transient errors are retried like a single-case request; if the
+    response is unusable, or leaves cases out, those cases are retried in
+    their own requests.
+    Each analysis is cached under the same key a single-case request would use.
+    """
+    cases = "\n\n".join(f"# CASE {i}\n\n{text}" for i, (_, text) in enumerate(texts, 1))
+    user_prompt = f"""{_REYNOLDS_REFERENCE}
+# THE {len(texts)} CASE TEXTS YOU ARE ANALYZING:
+
+{_ARGUMENT_STYLE_NOTE}
+
+Return exactly one analysis per case, tagged with the number from its "# CASE n" heading.
+
+{cases}
+"""
+
+    messages = [
+        {"role": "developer", "content": _SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+    by_number = {}
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            resp = await _create_completion(client, messages, ExtractCaseRelevancyBatch, len(user_prompt))
+            by_number = {case.case_number: case.analysis for case in resp.cases}
+            break
+
+        except _RETRYABLE_ERRORS as e:
+            logger.error("❌ Batch of %d cases failed: %s: %s", len(texts), type(e).__name__, e, exc_info=DEBUG)
+
+            if attempt < MAX_RETRIES:
+                wait_time = _retry_delay(e, attempt)
+                logger.warning("\033[33m⚠️  Retrying batch of %d cases in %ss...\033[0m", len(texts), wait_time)
+                await asyncio.sleep(wait_time)
+            else:
+                error_msg = f"Failed after {MAX_RETRIES} retries: {e}"
+                return [DocumentAnalysis(filename=filename, analysis=None, error=error_msg) for filename, _ in texts]
+        except ValueError as e:
+            # A malformed or invalid batch response; the cases may still come
+            # back fine one at a time
+            logger.warning("\033[33m⚠️  Batch response was unusable (%s), retrying individually\033[0m", e)
+            break
+        except Exception as e:
+            # Bad requests and auth failures will fail the same way for each case
+            logger.error("❌ Batch of %d cases failed: %s: %s", len(texts), type(e).__name__, e, exc_info=DEBUG)
+            return [DocumentAnalysis(filename=filename, analysis=None, error=f"{type(e).__name__}: {e}") for filename, _ in texts]
+
+    results = []
+    missing = []
+    for i, (filename, text) in enumerate(texts, 1):
+        if i in by_number:
+            results.append(DocumentAnalysis(filename=filename, analysis=by_number[i]))
+        else:
+            missing.append((filename, text))
+    await asyncio.gather(*[
+        _store_analysis(analysis_cache_path(_ANALYSIS_CACHE, text), filename, by_number[i])
+        for i, (filename, text) in enumerate(texts, 1) if i in by_number
+    ])
+
+    if missing and by_number:
+        logger.warning("\033[33m⚠️  Batch missed %d of %d cases, retrying them individually\033[0m", len(missing), len(texts))
+    elif not missing:
+        logger.info("✓ Batch model call successful (%d cases)", len(texts))
+
+    return results + await asyncio.gather(*[
+        analyze_text(client, text, filename) for filename, text in missing
+    ])
+
+def is_relevant_candidate(text: str) -> bool:
+    """Whether the case mentions either phrase the analysis is about."""
+    lowered = text.lower()
+    return any(keyword in lowered for keyword in _KEYWORDS)
+
+def skipped_analysis(filename: str, reason: str) -> DocumentAnalysis:
+    """A canned Low / Does not Support result for a document that was not sent to the model."""
+    analysis = ExtractCaseRelevancy(
+        blue_book_citation=filename,
+        summary=reason,
+        relevance_level="Low",
+        reasoning=f"Not sent to the model: {reason}",
+        key_points=(),
+        citations=(),
+        quotes=(),
+        argument="",
+        support_level="Does not Support",
+    )
+    return DocumentAnalysis(filename=filename, analysis=analysis)
+
+def checkpoint_key(file_path) -> str:
+    """
+    A SHA-256 of everything that decides a document's result: the model, the
+    prompts, the screening settings and the file's own path, mtime and size.
+    """
+    settings = f"{MIN_CHARS}:{MAX_CHARS}:{PREFILTER_KEYWORDS}:{_source_key(file_path)}"
+    return hashlib.sha256(
+        (OPENAI_MODEL_NAME + _SYSTEM_PROMPT + _build_user_prompt("") + settings).encode("utf-8")
+    ).hexdigest()
+
+def load_checkpoint(path: Path, keys: dict) -> dict:
+    """
+    Map each filename whose latest checkpoint entry succeeded under its current
+    key in keys to its analysis. Later entries win, so a document that failed
+    and then succeeded counts as done, and one whose file or settings changed
+    since it was recorded does not.
+    """
+    done = {}
+    if not path.exists():
+        return done
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue  # A line cut short by a crash mid-write
+            filename = entry.get("filename")
+            if entry.get("analysis") is not None and filename in keys and entry.get("key") == keys[filename]:
+                done[filename] = load_cached_analysis(entry["analysis"])
+            else:
+                done.pop(filename, None)
+    return done
+
+async def process_document_group(client, group: List[Tuple[str, str]]) -> List[DocumentAnalysis]:
+    """Analyze one group of documents, reporting any unexpected error against each of them."""
+    try:
+        if len(group) > 1:
+            return await analyze_batch(client, group)
+        filename, text = group[0]
+        return [await analyze_text(client, text, filename)]
+    except Exception as e:
+        return [DocumentAnalysis(filename=filename, analysis=None, error=str(e)) for filename, _ in group]
+
+_dirs_ready = False
 
 async def main_async():
     start_time = time.time()
-    print("\033[1m🚀 Starting document analysis...\033[0m")
-    
-    # Create folders if they don't exist
-    Path(INPUT_FOLDER).mkdir(exist_ok=True)
-    Path(OUTPUT_FOLDER).mkdir(exist_ok=True)
+    logger.info("\033[1m🚀 Starting document analysis...\033[0m")
     
-    # Also create subfolders for High, Medium, Low relevance
+    # Subfolders for High, Medium, Low relevance
     high_folder = os.path.join(OUTPUT_FOLDER, "high_relevance")
     medium_folder = os.path.join(OUTPUT_FOLDER, "medium_relevance")
     low_folder = os.path.join(OUTPUT_FOLDER, "low_relevance")
-    Path(high_folder).mkdir(exist_ok=True)
-    Path(medium_folder).mkdir(exist_ok=True)
-    Path(low_folder).mkdir(exist_ok=True)
-
-    # Initialize documents for each relevance level
-    high_doc = Document()
-    medium_doc = Document()
-    low_doc = Document()
     
+    # Create folders if they don't exist; skipped on repeated calls in the same process
+    global _dirs_ready
+    if not _dirs_ready:
+        for folder in (INPUT_FOLDER, high_folder, medium_folder, low_folder):
+            os.makedirs(folder, exist_ok=True)
+        _dirs_ready = True
+
+    # A fresh concurrency limiter for every run, since its condition is bound
+    # to the event loop that first waits on it
+    global _limiter
+    _limiter = AdaptiveLimiter(MAX_CONCURRENT_REQUESTS)
+
     # Set up the OpenAI client
-    print("\n🔍 Debug: Setting up OpenAI client...")
+    logger.debug("🔍 Setting up OpenAI client...")
     try:
-        openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-        # Then wrap it with instructor
-        client = instructor.from_openai(openai_client)
-
-        print("✓ OpenAI instructor client created successfully")
+        # One pooled HTTP/2 connection set shared by every request
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=5.0),
+        )
+        # The SDK's own retries are off so every attempt passes through the
+        # request limiters and a 429 reaches the adaptive limit right away
+        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+
+        logger.debug("✓ OpenAI client created successfully")
         
     except Exception as e:
-        print(f"\n❌ Error during client setup: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print("Full traceback:")
-        traceback.print_exc()
+        logger.error("❌ Error during client setup: %s: %s", type(e).__name__, e, exc_info=DEBUG)
         return
 
-    print("\033[32m✓ Successfully initialized OpenAI instructor client\033[0m")
+    logger.info("\033[32m✓ Successfully initialized OpenAI client\033[0m")
 
-    combined_doc = Document()
+    async with client:
+        logger.info("📁 Scanning input folder...")
+        # scandir reports the entry type from the directory listing itself, so
+        # filtering out subfolders needs no extra stat per file
+        with os.scandir(INPUT_FOLDER) as it:
+            entries = [(e.name, e.path) for e in it if e.is_file() and e.name.endswith('.docx')]
     
-    # Collect all documents to process
-    documents_to_process = []
-    print("\n📁 Scanning input folder...")
-    for filename in os.listdir(INPUT_FOLDER):
-        if filename.endswith('.docx'):
-            file_path = os.path.join(INPUT_FOLDER, filename)
-            try:
-                text = extract_text_from_docx(file_path)
-                documents_to_process.append((filename, text))
-                print(f"\033[32m✓ Successfully read {filename}\033[0m")
-            except Exception as e:
-                print(f"\033[31m❌ Error reading {filename}: {e}\033[0m")
+        if not entries:
+            logger.warning("\033[33m⚠️  No documents found to process\033[0m")
+            return
     
-    if not documents_to_process:
-        print("\n\033[33m⚠️  No documents found to process\033[0m")
-        return
+        logger.info("📊 Found %d documents to process", len(entries))
     
-    print(f"\n📊 Found {len(documents_to_process)} documents to process")
-    print(f"🔄 Processing in batches of {MAX_CONCURRENT_REQUESTS}")
+        # Documents already analyzed by an earlier, interrupted run are restored
+        # from the checkpoint rather than sent to the model again
+        checkpoint_path = Path(CHECKPOINT_FILE)
+        keys = {name: checkpoint_key(path) for name, path in entries}
+        done = load_checkpoint(checkpoint_path, keys)
+        restored = [name for name, _ in entries if name in done]
+        entries = [(name, path) for name, path in entries if name not in done]
+        if restored:
+            logger.info("♻️  Resuming from %s: %d documents already analyzed", checkpoint_path, len(restored))
+        logger.info("🔄 Processing with up to %d concurrent requests", MAX_CONCURRENT_REQUESTS)
     
-    successful_analyses = []
-    failed_analyses = []
+        read_count = 0
+        successful_count = 0
+        failed_analyses = []
     
-    for i in range(0, len(documents_to_process), MAX_CONCURRENT_REQUESTS):
-        batch = documents_to_process[i:i + MAX_CONCURRENT_REQUESTS]
-        batch_num = i // MAX_CONCURRENT_REQUESTS + 1
-        total_batches = (len(documents_to_process) + MAX_CONCURRENT_REQUESTS - 1) // MAX_CONCURRENT_REQUESTS
-        
-        print(f"\n Processing batch {batch_num}/{total_batches} ({len(batch)} documents)...")
-        batch_start_time = time.time()
-        
-        try:
-            batch_results = await process_document_batch(client, batch)
-            
-            for result in batch_results:
-                if result.error or result.analysis is None:
-                    failed_analyses.append(result)
-                else:
-                    successful_analyses.append(result)
-            
-            batch_time = time.time() - batch_start_time
-            print(f"\033[32m✓ Completed batch {batch_num}/{total_batches} in {batch_time:.1f}s\033[0m")
-            
-        except Exception as e:
-            print(f"\033[31m❌ Error processing batch {batch_num}: {e}\033[0m")
+        # One doc for each Relevance x Support Level combination, saved into the
+        # folder for its relevance level. Created on first use so combinations
+        # with no cases never build a document.
+        relevance_folders = {"High": high_folder, "Medium": medium_folder, "Low": low_folder}
+        support_levels = ["Strongly Supports", "Supports", "Does not Support"]
+        combo_folders = {(r, s): folder for r, folder in relevance_folders.items() for s in support_levels}
+        docs_map = {}
     
-    # Modify the document creation section
-    print("\n Creating final documents...")
-    high_cases = [a for a in successful_analyses if a.analysis.relevance_level == "High"]
-    medium_cases = [a for a in successful_analyses if a.analysis.relevance_level == "Medium"]
-    low_cases = [a for a in successful_analyses if a.analysis.relevance_level == "Low"]
+        # Results are appended to their documents as they arrive, from this
+        # coroutine only, so python-docx is never touched concurrently and no
+        # analysis is held once it has been written
+        def write(result):
+            nonlocal successful_count
+            successful_count += 1
+            combo = (result.analysis.relevance_level, result.analysis.support_level)
+            if combo in combo_folders:
+                is_first = combo not in docs_map
+                if is_first:
+                    docs_map[combo] = new_report_document()
+                create_formatted_docx(docs_map[combo], result.filename, result.analysis, is_first=is_first)
     
-    # Process each relevance level and store a single doc for each
-    for cases, doc, level, folder_path in [
-        (high_cases, high_doc, "high", high_folder),
-        (medium_cases, medium_doc, "medium", medium_folder),
-        (low_cases, low_doc, "low", low_folder)
-    ]:
-        for i, analysis in enumerate(cases):
-            create_formatted_docx(doc, analysis.filename, analysis.analysis, is_first=(i == 0))
-        
-        if cases:  # Only save if there are cases of this relevance level
-            output_file = os.path.join(folder_path, f"{level}_relevance_analysis.docx")
-            doc.save(output_file)
-            print(f"\033[32m✓ {level.capitalize()} relevance analysis saved to {output_file}\033[0m")
+        for filename in restored:
+            read_count += 1
+            write(DocumentAnalysis(filename=filename, analysis=done.pop(filename)))
     
-    # NEW CODE TO OUTPUT 9 DOCUMENTS (IF THEY EXIST) INTO THE THREE FOLDERS
-    # We create a doc for each combination of Relevance x Support Level
-    docs_map = {}
-    relevance_levels = ["High", "Medium", "Low"]
-    support_levels = ["Strongly Supports", "Supports", "Does not Support"]
-    for r in relevance_levels:
-        for s in support_levels:
-            docs_map[(r, s)] = Document()
+        # Each line is flushed as soon as it is written, so nothing already paid
+        # for is lost if the run dies
+        with open(checkpoint_path, "ab") as checkpoint:
     
-    results_by_combo = defaultdict(list)
-    for analysis_result in successful_analyses:
-        if analysis_result.analysis:
-            r = analysis_result.analysis.relevance_level
-            s = analysis_result.analysis.support_level
-            if r in relevance_levels and s in support_levels:
-                results_by_combo[(r, s)].append(analysis_result)
+            def record(result):
+                checkpoint.write(orjson.dumps({
+                    "filename": result.filename,
+                    "key": keys[result.filename],
+                    "analysis": result.analysis.model_dump() if result.analysis else None,
+                    "error": result.error,
+                }) + b"\n")
+                checkpoint.flush()
     
-    for (r, s), doc_combo in docs_map.items():
-        combo_cases = results_by_combo.get((r, s), [])
-        if combo_cases:
-            for i, analysis in enumerate(combo_cases):
-                create_formatted_docx(doc_combo, analysis.filename, analysis.analysis, is_first=(i == 0))
-            
-            # Choose subfolder based on r
-            if r == "High":
-                subfolder = high_folder
-            elif r == "Medium":
-                subfolder = medium_folder
-            else:
-                subfolder = low_folder
-            
-            output_file = os.path.join(subfolder, f"Relevance {r} - {s}.docx")
+            # Parsing is CPU-bound, so spread it across processes, and start each
+            # document's analysis as soon as its text is ready instead of waiting
+            # for the whole folder to be read. Every task is started right away;
+            # the request limiter keeps at most MAX_CONCURRENT_REQUESTS calls in
+            # flight and a slow call no longer holds up the ones queued behind it.
+            loop = asyncio.get_running_loop()
+            workers = max(1, min(len(entries), (os.cpu_count() or 2) - 1))
+            tasks = []
+            pending = []
+            skipped = 0
+            total = 0
+    
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                async def read(filename, path):
+                    try:
+                        return filename, await loop.run_in_executor(pool, cached_extract, path)
+                    except Exception as e:
+                        logger.error("\033[31m❌ Error reading %s: %s\033[0m", filename, e)
+                        return filename, None
+    
+                for next_read in asyncio.as_completed([read(name, path) for name, path in entries]):
+                    filename, text = await next_read
+                    if text is None:
+                        continue
+                    read_count += 1
+                    logger.info("\033[32m✓ Successfully read %s\033[0m", filename)
+    
+                    if len(text) < MIN_CHARS:
+                        result = skipped_analysis(filename, f"The document contains only {len(text)} characters of text.")
+                        record(result)
+                        write(result)
+                        skipped += 1
+                        continue
+                    if len(text) > MAX_CHARS:
+                        logger.warning("\033[33m⚠️  %s has %d characters; truncating to %d\033[0m", filename, len(text), MAX_CHARS)
+                        text = text[:MAX_CHARS]
+    
+                    if PREFILTER_KEYWORDS and not is_relevant_candidate(text):
+                        result = skipped_analysis(filename, "The case text does not mention spoliation or impairment of a civil claim.")
+                        record(result)
+                        write(result)
+                        skipped += 1
+                        continue
+    
+                    # Short cases wait for a full batch; long ones, and ones whose
+                    # analysis is already cached, are sent alone (a cached one
+                    # never reaches the API)
+                    total += 1
+                    if (BATCH_SIZE > 1 and len(text) <= BATCH_MAX_CHARS
+                            and not analysis_cache_path(_ANALYSIS_CACHE, text).exists()):
+                        pending.append((filename, text))
+                        if len(pending) < BATCH_SIZE:
+                            continue
+                        group, pending = pending, []
+                    else:
+                        group = [(filename, text)]
+                    tasks.append(asyncio.create_task(process_document_group(client, group)))
+    
+            if pending:
+                tasks.append(asyncio.create_task(process_document_group(client, pending)))
+            if skipped:
+                logger.info("⏭️  Skipped %d documents that were too short or had no spoliation keywords", skipped)
+    
+            completed = 0
+            for next_done in asyncio.as_completed(tasks):
+                for result in await next_done:
+                    completed += 1
+                    record(result)
+                    if result.error or result.analysis is None:
+                        failed_analyses.append(result)
+                        logger.error("\033[31m❌ [%d/%d] %s failed\033[0m", completed, total, result.filename)
+                    else:
+                        write(result)
+                        logger.info("\033[32m✓ [%d/%d] %s analyzed\033[0m", completed, total, result.filename)
+    
+        logger.info("Creating final documents...")
+        for (r, s), doc_combo in docs_map.items():
+            output_file = os.path.join(combo_folders[(r, s)], f"Relevance {r} - {s}.docx")
             doc_combo.save(output_file)
-            print(f"\033[32m✓ Relevance {r} - {s} analysis saved to {output_file}\033[0m")
-
-    total_time = time.time() - start_time
-    print("\n🔥 Summary:")
-    print(f"Total documents processed: {len(documents_to_process)}")
-    print(f"Successful analyses: {len(successful_analyses)}")
-    print(f"Failed analyses: {len(failed_analyses)}")
-    print(f"Total time: {total_time:.1f}s")
+            logger.info("\033[32m✓ Relevance %s - %s analysis saved to %s\033[0m", r, s, output_file)
+
+        # A clean run leaves nothing to resume, so the next one starts fresh
+        # (unchanged documents are still served from the analysis cache)
+        if not failed_analyses:
+            checkpoint_path.unlink(missing_ok=True)
+
+        total_time = time.time() - start_time
+        logger.info("🔥 Summary:")
+        logger.info("Total documents processed: %d", read_count)
+        logger.info("Successful analyses: %d", successful_count)
+        logger.info("Failed analyses: %d", len(failed_analyses))
+        logger.info("Total time: %.1fs", total_time)
     
-    if failed_analyses:
-        print("\n❌ Failed documents:")
-        for failed in failed_analyses:
-            print(f"- {failed.filename}: {failed.error}")
+        if failed_analyses:
+            logger.error("❌ Failed documents:")
+            for failed in failed_analyses:
+                logger.error("- %s: %s", failed.filename, failed.error)
     
-    print("\n\033[1m✨ Processing complete!\033[0m")
+        logger.info("\033[1m✨ Processing complete!\033[0m")
+
+def configure_logging() -> QueueListener:
+    """
+    Send all log records through a queue to a listener thread that writes them
+    to stderr, so logging from the event loop never blocks on the stream.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    log_queue = SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(QueueHandler(log_queue))
+    # httpx and the OpenAI SDK log every request at INFO or DEBUG; keep only their warnings
+    for name in ("httpx", "httpcore", "openai"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
 
 def main():
+    listener = configure_logging()
     try:
         asyncio.run(main_async())
     except KeyboardInterrupt:
-        print("\n\033[33m⚠️  Process interrupted by user\033[0m")
+        logger.warning("\033[33m⚠️  Process interrupted by user\033[0m")
     except Exception as e:
-        print(f"\n\033[31m❌ Fatal error: {str(e)}\033[0m")
+        logger.error("\033[31m❌ Fatal error: %s\033[0m", e)
+    finally:
+        # Flush any queued records before exiting
+        listener.stop()
 
 if __name__ == "__main__":
     main()